@@ -2,13 +2,20 @@ import os
 import time
 import json
 import ast
+import hashlib
 import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from datetime import datetime, timezone
 
+import numpy as np
 import pandas as pd
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
-from alpaca_trade_api import REST
+from requests.adapters import HTTPAdapter, Retry
+from alpaca_trade_api import REST, Stream
 
 # ----------------------------------------------------------------------
 # Helpers: env parsing
@@ -32,6 +39,20 @@ def get_env_float(env_name: str, default: float) -> float:
         return float(default)
 
 
+def get_env_bool(env_name: str, default: bool) -> bool:
+    """
+    Read env var as bool (1/true/yes/on) with fallback.
+    Tries the exact name and an uppercase variant.
+    """
+    raw = os.environ.get(env_name)
+    if raw is None:
+        raw = os.environ.get(env_name.upper())
+
+    if raw is None:
+        return bool(default)
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
 # Base thresholds (stocks/default)
 STOP_LOSS_PCT = get_env_float("STOP_LOSS_PCT", -3.0)
 ARMED_GAIN_PCT = get_env_float("ARMED_GAIN_PCT", 5.0)
@@ -44,27 +65,18 @@ OPTION_TRAIL_DROP_PCT = get_env_float("Option_TRAIL_DROP_PCT", TRAIL_DROP_PCT)
 
 
 # ----------------------------------------------------------------------
-# Helpers: option detection + per-position thresholds
+# Helpers: option detection
 # ----------------------------------------------------------------------
 # Alpaca options symbols are typically OCC-like: AAPL250117C00150000
 _OCC_OPTION_RE = re.compile(r"^[A-Z]{1,6}\d{6}[CP]\d{8}$")
+_OCC_MIN_LEN = 16  # 1-char root + YYMMDD + C/P + 8-digit strike
 
+@lru_cache(maxsize=2048)
 def looks_like_option_symbol(symbol: str) -> bool:
-    return bool(_OCC_OPTION_RE.match(symbol or ""))
-
-def thresholds_for_position(pos):
-    """
-    Returns (stop_loss_pct, armed_gain_pct, trail_drop_pct, is_option)
-    using option thresholds if this is an options position.
-    """
-    symbol = str(getattr(pos, "symbol", "") or "")
-    asset_class = str(getattr(pos, "asset_class", "") or "").lower()
-
-    is_option = (asset_class == "us_option") or looks_like_option_symbol(symbol)
-
-    if is_option:
-        return OPTION_STOP_LOSS_PCT, OPTION_ARMED_GAIN_PCT, OPTION_TRAIL_DROP_PCT, True
-    return STOP_LOSS_PCT, ARMED_GAIN_PCT, TRAIL_DROP_PCT, False
+    # Cheap reject for plain equity tickers before running the regex
+    if not symbol or len(symbol) < _OCC_MIN_LEN or not symbol[-1].isdigit():
+        return False
+    return bool(_OCC_OPTION_RE.match(symbol))
 
 
 # ----------------------------------------------------------------------
@@ -107,6 +119,19 @@ def connect_sheet():
     creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
     client = gspread.authorize(creds)
 
+    # Keep-alive connection pool + backoff on rate limits / transient errors.
+    # Only idempotent methods are retried (not POST), so appends never double up.
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        raise_on_status=False,
+    )
+    client.http_client.session.mount(
+        "https://",
+        HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry),
+    )
+
     sheet = client.open("Active-Investing")
     try:
         ws = sheet.worksheet("Alpaca-Trader")
@@ -132,55 +157,109 @@ alpaca = REST(API_KEY, API_SECRET, APCA_API_BASE_URL)
 # ----------------------------------------------------------------------
 # Ensure Alpaca-Trader sheet has correct structure
 # ----------------------------------------------------------------------
-def ensure_sheet_structure(ws):
-    # Main active positions header in A1:H1
-    sheet_header = [
-        "Ticker", "Qty", "Cost Basis", "Current Price",
-        "% Gain", "All-Time High % Gain", "Armed?", "Last Updated"
-    ]
+# Main active positions header in A1:H1
+SHEET_HEADER = [
+    "Ticker", "Qty", "Cost Basis", "Current Price",
+    "% Gain", "All-Time High % Gain", "Armed?", "Last Updated"
+]
 
-    try:
-        existing = ws.row_values(1)
-        if existing[:len(sheet_header)] != sheet_header:
-            ws.update(values=[sheet_header], range_name="A1:H1")
-    except Exception as e:
-        print("Error ensuring main header:", e)
-        ws.update(values=[sheet_header], range_name="A1:H1")
+# Section header for closed trades in J1:N1
+CLOSED_HEADER = ["Closed Trades", "Ticker", "% Gain/Loss", "Armed?", "Closed At"]
 
-    # Section header for closed trades in J1:N1
-    closed_header = ["Closed Trades", "Ticker", "% Gain/Loss", "Armed?", "Closed At"]
-    try:
-        if ws.cell(1, 10).value != "Closed Trades":  # col J
-            ws.update(values=[closed_header], range_name="J1:N1")
-    except Exception as e:
-        print("Error ensuring closed-trades header:", e)
-        ws.update(values=[closed_header], range_name="J1:N1")
+
+# Set once the headers have been checked; reset after a failed cycle
+_headers_verified = False
+
+def ensure_sheet_structure(ws, main_row=None, closed_row=None):
+    """
+    Rewrites the A1:H1 / J1:N1 headers if they don't match.
+    Pass already-fetched header rows to skip reading them from the sheet;
+    otherwise both are read with a single A1:N1 get.
+    """
+    global _headers_verified
+
+    if main_row is None or closed_row is None:
+        try:
+            values = ws.get("A1:N1")
+            header_row = values[0] if values else []
+        except Exception as e:
+            print("Error reading sheet headers:", e)
+            header_row = []
+        if main_row is None:
+            main_row = header_row[:8]
+        if closed_row is None:
+            closed_row = header_row[9:14]  # cols J:N
+
+    # Only rewrite the sub-range(s) that are wrong, in one call
+    fixes = []
+    if main_row[:len(SHEET_HEADER)] != SHEET_HEADER:
+        fixes.append({"range": "A1:H1", "values": [SHEET_HEADER]})
+    if (closed_row[0] if closed_row else None) != "Closed Trades":
+        fixes.append({"range": "J1:N1", "values": [CLOSED_HEADER]})
+
+    if fixes:
+        ws.batch_update(fixes)
+
+    _headers_verified = True
 
 
 # ----------------------------------------------------------------------
 # Load active tracker data from sheet (A1:H)
 # ----------------------------------------------------------------------
-def load_active(ws):
-    values = ws.get_values("A1:H500")
-
-    # If nothing or only header
-    if not values or len(values) < 2:
-        return pd.DataFrame(columns=[
-            "Ticker", "Qty", "Cost Basis", "Current Price",
-            "% Gain", "All-Time High % Gain", "Armed?", "Last Updated"
-        ])
-
-    header = values[0]
-    rows = values[1:]
+def active_frame(values):
+    """
+    Builds the active-positions DataFrame from raw A1:H500 values
+    (row 0 is the header row and is ignored).
+    """
+    rows = values[1:] if values else []
 
     # Strip out completely empty rows
     rows = [row for row in rows if any(cell != "" for cell in row)]
     if not rows:
-        return pd.DataFrame(columns=header)
+        return pd.DataFrame(columns=SHEET_HEADER)
 
     # Pad rows to header length
-    padded_rows = [row + [""] * (len(header) - len(row)) for row in rows]
-    return pd.DataFrame(padded_rows, columns=header)
+    padded_rows = [row[:len(SHEET_HEADER)] + [""] * (len(SHEET_HEADER) - len(row)) for row in rows]
+    return pd.DataFrame(padded_rows, columns=SHEET_HEADER)
+
+
+def fetch_sheet_state(ws):
+    """
+    Reads A1:H500 and J1:N1 in one values batchGet, fixes the headers
+    if needed and returns the active-positions DataFrame.
+    """
+    resp = ws.spreadsheet.values_batch_get([
+        gspread.utils.absolute_range_name(ws.title, "A1:H500"),
+        gspread.utils.absolute_range_name(ws.title, "J1:N1"),
+    ])
+    value_ranges = resp.get("valueRanges", [])
+    active_values = value_ranges[0].get("values", []) if len(value_ranges) > 0 else []
+    closed_values = value_ranges[1].get("values", []) if len(value_ranges) > 1 else []
+
+    ensure_sheet_structure(
+        ws,
+        main_row=active_values[0] if active_values else [],
+        closed_row=closed_values[0] if closed_values else [],
+    )
+    return active_frame(active_values)
+
+
+def saved_state(df):
+    """
+    Returns {ticker: (saved_ath or None, armed)} from the active DataFrame.
+    The first row wins if a ticker appears more than once.
+    """
+    state = {}
+    if df.empty:
+        return state
+
+    for ticker, ath_val, armed_val in zip(df["Ticker"], df["All-Time High % Gain"], df["Armed?"]):
+        if ticker not in state:
+            state[ticker] = (
+                safe_float(ath_val, None),
+                str(armed_val).strip().upper() == "TRUE",
+            )
+    return state
 
 
 def safe_float(val, fallback=None):
@@ -196,118 +275,397 @@ def safe_float(val, fallback=None):
 
 
 # ----------------------------------------------------------------------
-# Log a closed trade (J table)
+# Log closed trades (J table)
 # ----------------------------------------------------------------------
-def record_closed_trade(ws, ticker, gain, armed):
-    row = ["", ticker, gain, armed, datetime.now(timezone.utc).isoformat()]
-    ws.append_row(row, table_range="J1")
+# Closed-trade rows are buffered during a cycle and appended in one call
+_closed_buffer = []
+
+def record_closed_trade(ticker, gain, armed, closed_at):
+    row = ["", ticker, gain, armed, closed_at]
+    _closed_buffer.append(row)
+
+
+def flush_closed_trades(ws):
+    if not _closed_buffer:
+        return
+    ws.append_rows(_closed_buffer, value_input_option="RAW", table_range="J1")
+    _closed_buffer.clear()
 
 
 # ----------------------------------------------------------------------
-# Main trading loop logic
+# Write active positions (A2:H500)
 # ----------------------------------------------------------------------
-def run_cycle(ws):
-    ensure_sheet_structure(ws)
-    df = load_active(ws)
+# Number of active rows written last cycle (None = unknown, e.g. at startup)
+_active_rows_written = None
 
-    positions = alpaca.list_positions()
-    results = []
+# Hash of the last written results, ignoring the Last Updated column
+_last_results_hash = None
 
-    for pos in positions:
-        ticker = str(pos.symbol)
+def write_active(ws, results):
+    """
+    Writes fresh results at A2, then clears only the stale rows
+    left over from the previous write (all of A2:H500 on the first call).
+    Skips the write entirely if nothing but the timestamps changed.
+    """
+    global _active_rows_written, _last_results_hash
 
-        # Pick thresholds based on whether this position is an option
-        stop_loss_pct, armed_gain_pct, trail_drop_pct, is_option = thresholds_for_position(pos)
+    results_hash = hashlib.blake2b(
+        repr([row[:-1] for row in results]).encode(), digest_size=8
+    ).digest()
+    if results_hash == _last_results_hash:
+        return
 
-        # Parse core numbers
-        qty = safe_float(getattr(pos, "qty", None), 0.0) or 0.0
-        cost = safe_float(getattr(pos, "avg_entry_price", None), None)
-        current = safe_float(getattr(pos, "current_price", None), None)
+    last_row = len(results) + 1
+    if results:
+        ws.update(range_name=f"A2:H{last_row}", values=results)
 
-        # If we can't price it, skip updating logic for safety (avoid accidental sells)
-        if cost is None or current is None or cost == 0:
-            print(f"Skipping {ticker}: missing/invalid pricing (avg_entry_price={cost}, current_price={current})")
-            continue
+    if _active_rows_written is None:
+        stale_end = 500
+    else:
+        stale_end = min(500, _active_rows_written + 1)
+    if last_row < stale_end:
+        ws.batch_clear([f"A{last_row + 1}:H{stale_end}"])
 
-        # Percent gain: handle short positions safely
-        side = str(getattr(pos, "side", "long") or "long").lower()
-        if side == "short":
-            percent_gain = (cost - current) / cost * 100.0
-        else:
-            percent_gain = (current - cost) / cost * 100.0
-
-        # Fetch saved ATH + armed status from sheet
-        ath = percent_gain
-        armed = False
-
-        if not df.empty and "Ticker" in df.columns and ticker in df["Ticker"].values:
-            row = df[df["Ticker"] == ticker].iloc[0]
-            ath_val = row.get("All-Time High % Gain", "")
-            armed_val = row.get("Armed?", "")
-
-            saved_ath = safe_float(ath_val, None)
-            if saved_ath is not None:
-                ath = saved_ath
-
-            armed = str(armed_val).strip().upper() == "TRUE"
-
-        # If position goes negative, reset ATH and disarm
-        if percent_gain < 0:
-            ath = percent_gain
-            armed = False
-        else:
-            # Update ATH
-            if percent_gain > ath:
-                ath = percent_gain
-
-            # Arm if ATH has ever reached the threshold
-            if ath >= armed_gain_pct:
-                armed = True
-
-        # Selling logic
-        should_sell = False
-
-        # Rule 1: hard stop-loss
-        if percent_gain <= stop_loss_pct:
-            should_sell = True
-
-        # Rule 2: trailing take profit (only if armed)
-        if armed and percent_gain <= (ath - trail_drop_pct):
-            should_sell = True
-
-        if should_sell:
-            try:
-                alpaca.close_position(ticker)
-                print(
-                    f"SOLD {ticker} ({'OPTION' if is_option else 'STOCK'}) @ {round(percent_gain, 2)}% | "
-                    f"STOP_LOSS={stop_loss_pct}, ARMED_GAIN={armed_gain_pct}, TRAIL_DROP={trail_drop_pct}"
-                )
-                record_closed_trade(ws, ticker, round(percent_gain, 2), "TRUE" if armed else "FALSE")
-            except Exception as e:
-                print(f"Sell error for {ticker}:", e)
+    _active_rows_written = len(results)
+    _last_results_hash = results_hash
+
+
+# ----------------------------------------------------------------------
+# Close positions (one thread per in-flight request)
+# ----------------------------------------------------------------------
+SELL_WORKERS = 8
+
+def close_positions(tickers):
+    """
+    Calls alpaca.close_position for each ticker concurrently.
+    Returns {ticker: exception or None}.
+    """
+    if not tickers:
+        return {}
+
+    def close(ticker):
+        try:
+            alpaca.close_position(ticker)
+            return None
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=min(SELL_WORKERS, len(tickers))) as ex:
+        return dict(zip(tickers, ex.map(close, tickers)))
+
+
+# ----------------------------------------------------------------------
+# Per-ticker ATH/armed state
+# ----------------------------------------------------------------------
+# {ticker: (ath or None, armed)} kept in memory between cycles and persisted
+# to a local SQLite file; the sheet is only a display of this state.
+_state = {}
+
+STATE_DB_PATH = os.environ.get("STATE_DB_PATH", "state.db")
+
+def open_state_db(path=STATE_DB_PATH):
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE IF NOT EXISTS ath (ticker TEXT PRIMARY KEY, ath REAL, armed INTEGER)")
+    db.commit()
+    return db
+
+
+def load_state(ws, db):
+    """
+    Loads saved state from the local DB. If the DB is empty (first run or
+    a fresh container), recovers it from the sheet instead.
+    """
+    _state.clear()
+    rows = db.execute("SELECT ticker, ath, armed FROM ath").fetchall()
+    if rows:
+        _state.update({ticker: (ath, bool(armed)) for ticker, ath, armed in rows})
+    else:
+        _state.update(saved_state(fetch_sheet_state(ws)))
+        save_state(db)
+
+
+def save_state(db):
+    with db:
+        db.execute("DELETE FROM ath")
+        db.executemany(
+            "INSERT INTO ath (ticker, ath, armed) VALUES (?, ?, ?)",
+            [(ticker, ath, int(armed)) for ticker, (ath, armed) in _state.items()],
+        )
+
+
+# ----------------------------------------------------------------------
+# Evaluate all positions at once (columnar)
+# ----------------------------------------------------------------------
+# Raw Alpaca position fields -> evaluation column names
+RAW_POSITION_FIELDS = {
+    "symbol": "symbol",
+    "qty": "qty",
+    "avg_entry_price": "cost",
+    "current_price": "current",
+    "side": "side",
+    "asset_class": "asset_class",
+}
+
+def evaluate_positions(positions, prices=None):
+    """
+    Computes % gain, ATH, armed and sell flags for every position as
+    DataFrame columns, using the saved state in _state.
+    prices ({symbol: price}) overrides current_price where present.
+    Positions without usable pricing are dropped (avoid accidental sells).
+    """
+    # Build straight from each Entity's raw JSON dict
+    pos_df = (
+        pd.DataFrame([pos._raw for pos in positions])
+        .reindex(columns=list(RAW_POSITION_FIELDS))
+        .rename(columns=RAW_POSITION_FIELDS)
+    )
+    text_cols = ["symbol", "side", "asset_class"]
+    pos_df[text_cols] = pos_df[text_cols].fillna("").astype(str)
+    pos_df[["qty", "cost", "current"]] = pos_df[["qty", "cost", "current"]].apply(pd.to_numeric, errors="coerce")
+    pos_df["qty"] = pos_df["qty"].fillna(0.0)
+    if prices:
+        pos_df["current"] = pos_df["symbol"].map(prices).fillna(pos_df["current"])
+
+    # If we can't price it, skip updating logic for safety (avoid accidental sells)
+    invalid = pos_df["cost"].isna() | pos_df["current"].isna() | (pos_df["cost"] == 0)
+    for row in pos_df[invalid].itertuples(index=False):
+        print(f"Skipping {row.symbol}: missing/invalid pricing (avg_entry_price={row.cost}, current_price={row.current})")
+    pos_df = pos_df[~invalid]
+
+    # Join saved ATH + armed status from in-process state
+    state_df = pd.DataFrame(
+        [(ticker, ath, armed) for ticker, (ath, armed) in _state.items()],
+        columns=["symbol", "saved_ath", "saved_armed"],
+    )
+    pos_df = pos_df.merge(state_df, on="symbol", how="left")
+
+    # Pick thresholds based on whether each position is an option
+    # (Alpaca's asset_class / side enums are already lowercase)
+    is_option = (
+        pos_df["asset_class"].eq("us_option").to_numpy(dtype=bool)
+        | pos_df["symbol"].map(looks_like_option_symbol).to_numpy(dtype=bool)
+    )
+    stop = np.where(is_option, OPTION_STOP_LOSS_PCT, STOP_LOSS_PCT)
+    arm = np.where(is_option, OPTION_ARMED_GAIN_PCT, ARMED_GAIN_PCT)
+    trail = np.where(is_option, OPTION_TRAIL_DROP_PCT, TRAIL_DROP_PCT)
+
+    # Percent gain: handle short positions safely.
+    # Computed in place to avoid allocating a temporary per operation.
+    cost = pos_df["cost"].to_numpy(dtype=float)
+    current = pos_df["current"].to_numpy(dtype=float)
+    is_short = pos_df["side"].eq("short").to_numpy(dtype=bool)
+    pct = current - cost
+    np.negative(pct, out=pct, where=is_short)
+    pct /= cost
+    pct *= 100.0
+
+    saved_ath = pd.to_numeric(pos_df["saved_ath"], errors="coerce").to_numpy(dtype=float)
+    saved_armed = pos_df["saved_armed"].eq(True).to_numpy(dtype=bool)
+    ath = np.where(np.isnan(saved_ath), pct, saved_ath)
+
+    # If position goes negative, reset ATH and disarm;
+    # otherwise update ATH and arm if it has ever reached the threshold
+    negative = pct < 0
+    np.maximum(ath, pct, out=ath)
+    np.copyto(ath, pct, where=negative)
+    armed = ath >= arm
+    armed |= saved_armed
+    armed &= ~negative
+
+    # Rule 1: hard stop-loss
+    # Rule 2: trailing take profit (only if armed)
+    should_sell = pct <= ath - trail
+    should_sell &= armed
+    should_sell |= pct <= stop
+
+    pos_df["is_option"] = is_option
+    pos_df["stop"] = stop
+    pos_df["arm"] = arm
+    pos_df["trail"] = trail
+    pos_df["pct"] = pct
+    pos_df["ath"] = ath
+    pos_df["armed"] = armed
+    pos_df["should_sell"] = should_sell
+    return pos_df
+
+
+# ----------------------------------------------------------------------
+# Main trading loop logic
+# ----------------------------------------------------------------------
+def process_positions(positions, now_iso, prices=None):
+    """
+    Evaluates positions, updates _state and closes any that hit a sell rule.
+    Returns (active sheet rows, symbols still held and not pending a sell).
+    """
+    evaluated = evaluate_positions(positions, prices)
+    results = []
+    to_sell = []
+
+    for row in evaluated.itertuples(index=False):
+        _state[row.symbol] = (float(row.ath), bool(row.armed))
+
+        if row.should_sell:
+            to_sell.append((
+                row.symbol, float(row.pct), bool(row.armed), bool(row.is_option),
+                float(row.stop), float(row.arm), float(row.trail),
+            ))
             continue
 
         # Keep active
         results.append([
-            ticker,
-            qty,
-            cost,
-            current,
-            round(percent_gain, 2),
-            round(ath, 2),
-            "TRUE" if armed else "FALSE",
-            datetime.now(timezone.utc).isoformat(),
+            row.symbol,
+            float(row.qty),
+            float(row.cost),
+            float(row.current),
+            round(float(row.pct), 2),
+            round(float(row.ath), 2),
+            "TRUE" if row.armed else "FALSE",
+            now_iso,
         ])
 
-    # Update sheet: clear A2:H500 then write fresh results
-    ws.update(range_name="A2:H500", values=[[""] * 8] * 499)  # rows 2–500 inclusive
-    if results:
-        ws.update(range_name="A2", values=results)
+    # Close all triggered positions concurrently
+    sell_errors = close_positions([item[0] for item in to_sell])
+    for ticker, percent_gain, armed, is_option, stop_loss_pct, armed_gain_pct, trail_drop_pct in to_sell:
+        err = sell_errors[ticker]
+        if err is not None:
+            print(f"Sell error for {ticker}:", err)
+            continue
+
+        _state.pop(ticker, None)
+        print(
+            f"SOLD {ticker} ({'OPTION' if is_option else 'STOCK'}) @ {round(percent_gain, 2)}% | "
+            f"STOP_LOSS={stop_loss_pct}, ARMED_GAIN={armed_gain_pct}, TRAIL_DROP={trail_drop_pct}"
+        )
+        record_closed_trade(ticker, round(percent_gain, 2), "TRUE" if armed else "FALSE", now_iso)
+
+    return results, {row[0] for row in results}
+
+
+def run_cycle(ws, db):
+    # Headers don't change once written; only re-check after a failure
+    if not _headers_verified:
+        ensure_sheet_structure(ws)
+
+    positions = alpaca.list_positions()
+
+    # Streamed prices seen before this snapshot are older than current_price;
+    # only trades arriving after it may drive the streamed checks
+    with _prices_lock:
+        _latest_prices.clear()
+
+    now_iso = datetime.now(timezone.utc).isoformat()
+    results, active = process_positions(positions, now_iso)
+
+    # Positions re-checked against streamed prices until the next cycle
+    _watched[:] = [pos for pos in positions if str(pos.symbol) in active]
+
+    # Forget tickers that are no longer held
+    held = {str(pos.symbol) for pos in positions}
+    for ticker in [t for t in _state if t not in held]:
+        del _state[ticker]
+
+    save_state(db)
+
+    # Log any sells from this cycle in a single append
+    # (rows stay buffered on failure and are retried next cycle)
+    try:
+        flush_closed_trades(ws)
+    except Exception as e:
+        print("Error logging closed trades:", e)
+
+    write_active(ws, results)
+
+
+# ----------------------------------------------------------------------
+# Optional price streaming (between cycles)
+# ----------------------------------------------------------------------
+# When enabled, stock trades for held equities are pushed over Alpaca's
+# websocket and the sell rules are re-checked locally every
+# STREAM_CHECK_SECONDS. The 60s cycle still refreshes positions and the sheet.
+STREAM_PRICES = get_env_bool("STREAM_PRICES", False)
+STREAM_DATA_FEED = os.environ.get("STREAM_DATA_FEED", "iex")
+STREAM_CHECK_SECONDS = max(0.25, get_env_float("STREAM_CHECK_SECONDS", 1.0))
+# Minimum gap between the start of one cycle and a fill-triggered early cycle
+STREAM_REFRESH_MIN_SECONDS = max(1.0, get_env_float("STREAM_REFRESH_MIN_SECONDS", 10.0))
+
+_watched = []            # positions from the last cycle that are still active
+_latest_prices = {}      # {symbol: last streamed trade price}
+_prices_lock = threading.Lock()
+_subscribed = set()
+_refresh_event = threading.Event()  # set on fills to run a full cycle early
+
+
+async def on_trade(trade):
+    with _prices_lock:
+        _latest_prices[trade.symbol] = float(trade.price)
+
+
+async def on_trade_update(update):
+    if update.event in ("fill", "partial_fill"):
+        _refresh_event.set()
+
+
+def start_stream():
+    stream = Stream(API_KEY, API_SECRET, base_url=APCA_API_BASE_URL, data_feed=STREAM_DATA_FEED)
+    stream.subscribe_trade_updates(on_trade_update)
+    threading.Thread(target=stream.run, daemon=True).start()
+    return stream
+
+
+def sync_stream_symbols(stream):
+    """
+    Subscribes to trades for currently watched equities and drops the rest
+    (options aren't carried on the stock data stream).
+    """
+    wanted = {
+        str(pos.symbol) for pos in _watched
+        if getattr(pos, "asset_class", "") == "us_equity"
+    }
+    added = wanted - _subscribed
+    removed = _subscribed - wanted
+
+    if removed:
+        stream.unsubscribe_trades(*removed)
+        with _prices_lock:
+            for symbol in removed:
+                _latest_prices.pop(symbol, None)
+    if added:
+        stream.subscribe_trades(on_trade, *added)
+
+    _subscribed.clear()
+    _subscribed.update(wanted)
+
+
+def check_streamed_prices(ws, db):
+    """
+    Re-runs the sell rules for watched positions using streamed prices.
+    Only state and closed trades are written; the active table waits for
+    the next cycle.
+    """
+    with _prices_lock:
+        prices = dict(_latest_prices)
+
+    positions = [pos for pos in _watched if str(pos.symbol) in prices]
+    if not positions:
+        return
+
+    before = dict(_state)
+    _, active = process_positions(positions, datetime.now(timezone.utc).isoformat(), prices)
+
+    # Stop watching anything that was sold (or failed to sell) until the next cycle
+    checked = {str(pos.symbol) for pos in positions}
+    _watched[:] = [pos for pos in _watched if str(pos.symbol) not in checked or str(pos.symbol) in active]
+
+    if _state != before:
+        save_state(db)
+    flush_closed_trades(ws)
 
 
 # ----------------------------------------------------------------------
 # LOOP FOREVER
 # ----------------------------------------------------------------------
+CYCLE_SECONDS = 60
+
 if __name__ == "__main__":
     print(
         "Thresholds:\n"
@@ -315,14 +673,46 @@ if __name__ == "__main__":
         f"  OPTION : Option_STOP_LOSS_PCT={OPTION_STOP_LOSS_PCT}, "
         f"Option_ARMED_GAIN_PCT={OPTION_ARMED_GAIN_PCT}, "
         f"Option_TRAIL_DROP_PCT={OPTION_TRAIL_DROP_PCT}\n"
-        f"API BASE : {APCA_API_BASE_URL}"
+        f"API BASE : {APCA_API_BASE_URL}\n"
+        f"STREAM   : {'ON (' + STREAM_DATA_FEED + ')' if STREAM_PRICES else 'OFF'}"
     )
 
     ws = connect_sheet()
+    db = open_state_db()
+    load_state(ws, db)
+    stream = start_stream() if STREAM_PRICES else None
 
+    # Fixed-period schedule: cycle time is included in the 60s, not added to it
+    next_tick = time.monotonic()
     while True:
+        cycle_started = time.monotonic()
         try:
-            run_cycle(ws)
+            run_cycle(ws, db)
+            if stream is not None:
+                sync_stream_symbols(stream)
         except Exception as e:
             print("Error during cycle:", e)
-        time.sleep(60)
+            _headers_verified = False
+
+        next_tick += CYCLE_SECONDS
+        now = time.monotonic()
+        if next_tick < now:
+            # Cycle overran the period; start the next one right away without bursting
+            next_tick = now
+
+        if stream is None:
+            time.sleep(next_tick - now)
+            continue
+
+        # Between cycles, re-check sell rules on streamed prices; a fill
+        # (position opened/closed) pulls the next full cycle forward, but no
+        # sooner than STREAM_REFRESH_MIN_SECONDS after the last one started
+        while (remaining := next_tick - time.monotonic()) > 0:
+            if _refresh_event.wait(min(STREAM_CHECK_SECONDS, remaining)):
+                _refresh_event.clear()
+                next_tick = min(next_tick, max(time.monotonic(), cycle_started + STREAM_REFRESH_MIN_SECONDS))
+                continue
+            try:
+                check_streamed_prices(ws, db)
+            except Exception as e:
+                print("Error during streamed check:", e)